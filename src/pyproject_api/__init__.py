@@ -10,6 +10,7 @@ from ._frontend import (
 )
 from ._version import version
 from ._via_fresh_subprocess import SubprocessFrontend
+from ._via_reused_subprocess import ReuseSubprocessFrontend
 
 #: semantic version of the project
 __version__ = version
@@ -25,4 +26,5 @@ __all__ = [
     "SdistResult",
     "WheelResult",
     "SubprocessFrontend",
+    "ReuseSubprocessFrontend",
 ]
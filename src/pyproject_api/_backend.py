@@ -11,6 +11,9 @@ import os
 import sys
 import traceback
 
+#: marks a response on the standard output, followed by the payload length in bytes, a new line and the JSON payload
+RESPONSE_MARKER = "\0pyproject-api-response:"
+
 
 class MissingCommand(TypeError):
     """Missing command"""
@@ -57,6 +60,8 @@ def run(argv):
         flush()  # pragma: no branch
     while True:
         content = read_line()
+        if content is None:  # the frontend closed our standard input, no more messages to process
+            break
         if not content:
             continue
         flush()  # flush any output generated before
@@ -69,6 +74,11 @@ def run(argv):
             # ignore messages that are not valid JSON and contain a valid result path
             print("Backend: incorrect request to backend: {}".format(content), file=sys.stderr)
             flush()
+            # still respond, so that a frontend reusing the process knows this request has been processed
+            result = {"code": 1, "exc_type": "ValueError", "exc_msg": "incorrect request"}
+            write_response(encode_result(result))
+            print("Backend: Wrote response {} to standard output".format(result))  # used as done marker by frontend
+            flush()
         else:
             result = {}
             try:
@@ -87,20 +97,46 @@ def run(argv):
                 if not isinstance(exception, Exception):  # allow SystemExit/KeyboardInterrupt to go through
                     raise
             finally:
+                payload = encode_result(result)
                 try:
-                    with open(result_file, "wt") as file_handler:
-                        json.dump(result, file_handler)
+                    if result_file is not None:
+                        with open(result_file, "wb") as file_handler:
+                            file_handler.write(payload)
+                        payload = b""  # the response is in the file, the empty frame only marks the command done
                 except Exception:
                     traceback.print_exc()
                 finally:
+                    flush()  # the response must come after any output generated by the command
+                    write_response(payload)
                     # used as done marker by frontend
-                    print("Backend: Wrote response {} to {}".format(result, result_file))
+                    print("Backend: Wrote response {} to {}".format(result, result_file or "standard output"))
                     flush()  # pragma: no branch
         if reuse_process is False:  # pragma: no branch # no test for reuse process in root test env
             break
     return 0
 
 
+def encode_result(result):
+    try:
+        return json.dumps(result).encode("utf-8")
+    except Exception as exception:  # e.g. the hook returned an object JSON can't represent, report that instead
+        traceback.print_exc()
+        error = {"code": 1, "exc_type": exception.__class__.__name__, "exc_msg": str(exception)}
+        return json.dumps(error).encode("utf-8")
+
+
+def write_response(payload):
+    # the frame is written even without a payload (result in a file), as it marks the end of the command
+    # mark the end of the command on the standard error too, so a frontend reusing the process can split that stream
+    write(2, "{}\n".format(RESPONSE_MARKER).encode("utf-8"))
+    write(1, "{}{}\n".format(RESPONSE_MARKER, len(payload)).encode("utf-8") + payload)
+
+
+def write(fd, data):
+    while data:  # write to the file descriptor directly, so that no text layer can alter the payload
+        data = data[os.write(fd, data) :]
+
+
 def read_line():
     # for some reason input() seems to break (hangs forever) so instead we read byte by byte the unbuffered stream
     content = bytearray()
@@ -109,6 +145,8 @@ def read_line():
             char = os.read(0, 1)
         except EOFError:  # pragma: no cover # when the stdout is closed without exit
             break  # pragma: no cover
+        if not char:  # end of file, return what we have and signal it on the next call
+            return content if content else None
         if char == b"\n":  # pragma: no cover
             break
         if char != b"\r":  # pragma: win32 cover
@@ -1,5 +1,7 @@
 """Handles communication on the backend side between frontend and backend"""
-from typing import Any, Optional, Sequence
+from typing import Any, Dict, Optional, Sequence
+
+RESPONSE_MARKER: str
 
 class MissingCommand(TypeError): ...
 
@@ -13,5 +15,8 @@ class BackendProxy:
     def _exit(self) -> None: ...
 
 def run(argv: Sequence[str]) -> int: ...
-def read_line() -> bytearray: ...
+def encode_result(result: Dict[str, Any]) -> bytes: ...
+def write_response(payload: bytes) -> None: ...
+def write(fd: int, data: bytes) -> None: ...
+def read_line() -> Optional[bytearray]: ...
 def flush() -> None: ...
@@ -1,22 +1,94 @@
 """Build frontend for PEP-517"""
 import json
+import os
+import sys
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from tempfile import NamedTemporaryFile, TemporaryDirectory
+from tempfile import TemporaryDirectory, mkstemp
 from time import sleep
-from typing import Any, Dict, Iterator, List, NamedTuple, NoReturn, Optional, Tuple, cast
+from typing import Any, Dict, Iterator, List, NamedTuple, NoReturn, Optional, Sequence, Tuple, cast
 from zipfile import ZipFile
 
-import tomli
 from packaging.requirements import Requirement
 
+from pyproject_api._backend import RESPONSE_MARKER
 from pyproject_api._util import ensure_empty_dir
 
+if sys.version_info >= (3, 11):  # pragma: no cover (py311+)
+    import tomllib
+else:  # pragma: no cover (<py311)
+    import tomli as tomllib
+
 _HERE = Path(__file__).parent
+_BACKEND_SCRIPT = str(_HERE / "_backend.py")
 ConfigSettings = Optional[Dict[str, Any]]
 
 
+@lru_cache(maxsize=1024)
+def _parse_requirement(value: str) -> Requirement:
+    # the same instance is handed to every caller asking for this string, so it must be treated as read-only
+    return Requirement(value)
+
+
+class _BuildSystem(NamedTuple):
+    backend_paths: Tuple[str, ...]
+    requires: Optional[Tuple[Requirement, ...]]
+    build_backend: Optional[str]
+
+
+@lru_cache(maxsize=64)
+def _load_build_system(path: str, mtime_ns: int, size: int) -> _BuildSystem:  # noqa: U100
+    # the modification time and size are part of the cache key, so an edited file is parsed again
+    py_project = tomllib.loads(Path(path).read_bytes().decode("utf-8"))  # TOML files are always UTF-8 encoded
+    build_system = py_project.get("build-system", {})
+    requires = build_system.get("requires")
+    return _BuildSystem(
+        backend_paths=tuple(build_system.get("backend-path", ())),
+        requires=None if requires is None else tuple(_parse_requirement(r) for r in requires),
+        build_backend=build_system.get("build-backend"),
+    )
+
+
+def _extract_responses(out: str) -> Tuple[List[Dict[str, Any]], str]:
+    """:return: the responses the backend framed into its standard output, and the output without them"""
+    responses: List[Dict[str, Any]] = []
+    chunks: List[str] = []
+    at = 0
+    while True:
+        start = out.find(RESPONSE_MARKER, at)
+        if start == -1:
+            break
+        chunks.append(out[at:start])
+        size_start = start + len(RESPONSE_MARKER)
+        payload_start = out.index("\n", size_start) + 1
+        at = payload_start + int(out[size_start:payload_start])  # the payload is ASCII, so bytes match characters
+        if at > payload_start:  # an empty frame only marks the end of a command that responded via a result file
+            responses.append(_DECODE(out[payload_start:at]))
+    chunks.append(out[at:])
+    return responses, "".join(chunks)
+
+
+def _path_to_json(value: Any) -> str:
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+# a single encoder/decoder serves all messages, compact separators keep the messages sent to the backend small
+_ENCODE = json.JSONEncoder(separators=(",", ":"), default=_path_to_json).encode
+_DECODE = json.JSONDecoder().decode
+
+
+#: backend failures meaning the optional metadata hook is not available, so the metadata must come from a built wheel
+_HOOK_NOT_AVAILABLE = frozenset({"MissingCommand", "NotImplementedError", "UnsupportedOperation"})
+
+
+def _missing_response(msg: str) -> Dict[str, Any]:
+    return {"code": 1, "exc_type": "RuntimeError", "exc_msg": msg}
+
+
 class CmdStatus(ABC):
     @property
     @abstractmethod
@@ -24,16 +96,36 @@ class CmdStatus(ABC):
         """:return: truthful when the command finished running"""
         raise NotImplementedError
 
+    def wait(self) -> None:
+        """Block until the command finished running (subclasses should override this to avoid polling)."""
+        while not self.done:  # pragma: no branch
+            sleep(0.001)  # wait a bit for things to happen
+
     @abstractmethod
     def out_err(self) -> Tuple[str, str]:
         """:return: standard output and standard error text"""
         raise NotImplementedError
 
 
+class _CmdStatusGroup(CmdStatus):
+    """Status of commands that have been run one after the other"""
+
+    def __init__(self, statuses: Sequence[CmdStatus]) -> None:
+        self._statuses = statuses
+
+    @property
+    def done(self) -> bool:
+        return all(status.done for status in self._statuses)
+
+    def out_err(self) -> Tuple[str, str]:
+        out_err = [status.out_err() for status in self._statuses]
+        return "".join(out for out, _ in out_err), "".join(err for _, err in out_err)
+
+
 class RequiresBuildSdistResult(NamedTuple):
     """Information collected while acquiring the source distribution build dependencies"""
 
-    #: wheel build dependencies
+    #: source distribution build dependencies (shared between results, do not mutate them)
     requires: Tuple[Requirement, ...]
     #: backend standard output while acquiring the source distribution build dependencies
     out: str
@@ -44,7 +136,7 @@ class RequiresBuildSdistResult(NamedTuple):
 class RequiresBuildWheelResult(NamedTuple):
     """Information collected while acquiring the wheel build dependencies"""
 
-    #: wheel build dependencies
+    #: wheel build dependencies (shared between results, do not mutate them)
     requires: Tuple[Requirement, ...]
     #: backend standard output while acquiring the wheel build dependencies
     out: str
@@ -123,7 +215,12 @@ class Frontend(ABC):
     #: backend key when the ``pyproject.toml`` does not specify it
     LEGACY_BUILD_BACKEND: str = "setuptools.build_meta:__legacy__"
     #: backend requirements when the ``pyproject.toml`` does not specify it
-    LEGACY_REQUIRES: Tuple[Requirement, ...] = (Requirement("setuptools >= 40.8.0"), Requirement("wheel"))
+    LEGACY_REQUIRES: Tuple[Requirement, ...] = (
+        _parse_requirement("setuptools >= 40.8.0"),
+        _parse_requirement("wheel"),
+    )
+    #: the backend responds via a result file rather than on its standard output (for channels that can't carry it)
+    RESULT_VIA_FILE: bool = False
 
     def __init__(
         self,
@@ -150,6 +247,7 @@ class Frontend(ABC):
         self._backend_obj = backend_obj
         self.requires: Tuple[Requirement, ...] = requires
         self._reuse_backend = reuse_backend
+        self._backend_target: Tuple[str, ...] = (backend_module, backend_obj) if backend_obj else (backend_module,)
 
     @classmethod
     def create_args_from_folder(
@@ -159,7 +257,7 @@ class Frontend(ABC):
         Frontend creation arguments from a python project folder (thould have a ``pypyproject.toml`` file per PEP-518).
 
         :param folder: the python project folder
-        :return: the frontend creation args
+        :return: the frontend creation args (the requirements are cached and shared between calls, do not mutate them)
 
         E.g., to create a frontend from a python project folder:
 
@@ -168,23 +266,20 @@ class Frontend(ABC):
             frontend = Frontend(*Frontend.create_args_from_folder(project_folder))
         """
         py_project_toml = folder / "pyproject.toml"
-        if py_project_toml.exists():
-            with py_project_toml.open("rb") as file_handler:
-                py_project = tomli.load(file_handler)
-            build_system = py_project.get("build-system", {})
-            if "backend-path" in build_system:
-                backend_paths: Tuple[Path, ...] = tuple(folder / p for p in build_system["backend-path"])
-            else:
-                backend_paths = ()
-            if "requires" in build_system:
-                requires: Tuple[Requirement, ...] = tuple(Requirement(r) for r in build_system.get("requires"))
-            else:
-                requires = cls.LEGACY_REQUIRES
-            build_backend = build_system.get("build-backend", cls.LEGACY_BUILD_BACKEND)
-        else:
-            backend_paths = ()
-            requires = cls.LEGACY_REQUIRES
+        try:
+            stat = os.stat(py_project_toml)
+        except FileNotFoundError:
+            backend_paths: Tuple[Path, ...] = ()
+            requires: Tuple[Requirement, ...] = cls.LEGACY_REQUIRES
             build_backend = cls.LEGACY_BUILD_BACKEND
+        else:
+            build_system = _load_build_system(str(py_project_toml), stat.st_mtime_ns, stat.st_size)
+            backend_paths = tuple(folder / p for p in build_system.backend_paths)
+            requires = cls.LEGACY_REQUIRES if build_system.requires is None else build_system.requires
+            if build_system.build_backend is None:
+                build_backend = cls.LEGACY_BUILD_BACKEND
+            else:
+                build_backend = build_system.build_backend
         paths = build_backend.split(":")
         backend_module: str = paths[0]
         backend_obj: Optional[str] = paths[1] if len(paths) > 1 else None
@@ -198,10 +293,11 @@ class Frontend(ABC):
     @property
     def backend_args(self) -> List[str]:
         """:return: startup arguments for a backend"""
-        result: List[str] = [str(_HERE / "_backend.py"), str(self._reuse_backend), self._backend_module]
-        if self._backend_obj:
-            result.append(self._backend_obj)
-        return result
+        return self._make_backend_args(self._reuse_backend)
+
+    def _make_backend_args(self, reuse: bool) -> List[str]:
+        """:return: startup arguments for a backend, that either processes one message or all until stdin closes"""
+        return [_BACKEND_SCRIPT, str(reuse), *self._backend_target]
 
     def get_requires_for_build_sdist(
         self, config_settings: Optional[ConfigSettings] = None
@@ -218,7 +314,7 @@ class Frontend(ABC):
             result, out, err = [], exc.out, exc.err
         if not isinstance(result, list) or not all(isinstance(i, str) for i in result):
             self._unexpected_response("get_requires_for_build_sdist", result, "list of string", out, err)
-        return RequiresBuildSdistResult(tuple(Requirement(r) for r in cast(List[str], result)), out, err)
+        return RequiresBuildSdistResult(tuple(_parse_requirement(r) for r in cast(List[str], result)), out, err)
 
     def get_requires_for_build_wheel(
         self, config_settings: Optional[ConfigSettings] = None
@@ -235,7 +331,30 @@ class Frontend(ABC):
             result, out, err = [], exc.out, exc.err
         if not isinstance(result, list) or not all(isinstance(i, str) for i in result):
             self._unexpected_response("get_requires_for_build_wheel", result, "list of string", out, err)
-        return RequiresBuildWheelResult(tuple(Requirement(r) for r in cast(List[str], result)), out, err)
+        return RequiresBuildWheelResult(tuple(_parse_requirement(r) for r in cast(List[str], result)), out, err)
+
+    def get_requires_for_build_both(
+        self, config_settings: Optional[ConfigSettings] = None
+    ) -> Tuple[RequiresBuildSdistResult, RequiresBuildWheelResult]:
+        """
+        Get build requirements for both a source distribution and a wheel (per PEP-517) within one backend call.
+
+        :param config_settings: run arguments
+        :return: outcome for the source distribution and for the wheel (sharing the standard output and error)
+        """
+        kwargs = {"config_settings": config_settings}
+        cmds = ["get_requires_for_build_sdist", "get_requires_for_build_wheel"]
+        (sdist, wheel), out, err = self._send_batch([(cmd, kwargs) for cmd in cmds])
+        return (
+            RequiresBuildSdistResult(self._requires_from(cmds[0], sdist, out, err), out, err),
+            RequiresBuildWheelResult(self._requires_from(cmds[1], wheel, out, err), out, err),
+        )
+
+    def _requires_from(self, cmd: str, result: Dict[str, Any], out: str, err: str) -> Tuple[Requirement, ...]:
+        requires = result.get("return", [])  # the hooks are optional, so a failure means no extra requirements
+        if not isinstance(requires, list) or not all(isinstance(i, str) for i in requires):
+            self._unexpected_response(cmd, requires, "list of string", out, err)
+        return tuple(_parse_requirement(r) for r in cast(List[str], requires))
 
     def prepare_metadata_for_build_wheel(
         self, metadata_directory: Path, config_settings: Optional[ConfigSettings] = None
@@ -249,16 +368,16 @@ class Frontend(ABC):
         """
         if metadata_directory == self._root:
             raise RuntimeError(f"the project root and the metadata directory can't be the same {self._root}")
-        if metadata_directory.exists():  # start with fresh
-            ensure_empty_dir(metadata_directory)
-        metadata_directory.mkdir(parents=True, exist_ok=True)
+        ensure_empty_dir(metadata_directory)  # start with fresh
         try:
             basename, out, err = self._send(
                 cmd="prepare_metadata_for_build_wheel",
                 metadata_directory=metadata_directory,
                 config_settings=config_settings,
             )
-        except BackendFailed:
+        except BackendFailed as exception:
+            if exception.exc_type not in _HOOK_NOT_AVAILABLE:  # the hook failed, building a wheel would not help
+                raise
             # if backend does not provide it acquire it from the wheel
             basename, err, out = self._metadata_from_built_wheel(config_settings, metadata_directory)
         if not isinstance(basename, str):
@@ -329,11 +448,12 @@ class Frontend(ABC):
             extract_to = str(metadata_directory)
             basename = None
             with ZipFile(str(wheel), "r") as zip_file:
-                for name in zip_file.namelist():  # pragma: no branch
-                    path = Path(name)
-                    if path.parts[0].endswith(".dist-info"):
-                        basename = path.parts[0]
-                        zip_file.extract(name, extract_to)
+                for info in zip_file.infolist():  # pragma: no branch
+                    top_level = info.filename.split("/", 1)[0]
+                    if basename is None and top_level.endswith(".dist-info"):
+                        basename = top_level  # a wheel has a single metadata folder
+                    if top_level == basename:
+                        zip_file.extract(info, extract_to)  # streams the content, and guards against path traversal
             if basename is None:  # pragma: no branch
                 raise RuntimeError(f"no .dist-info found inside generated wheel {wheel}")
         return basename, err, out
@@ -344,36 +464,64 @@ class Frontend(ABC):
             yield Path(wheel_directory)
 
     def _send(self, cmd: str, **kwargs: Any) -> Tuple[Any, str, str]:
-        with NamedTemporaryFile(prefix=f"pep517_{cmd}-") as result_file_marker:
-            result_file = Path(result_file_marker.name).with_suffix(".json")
-            msg = json.dumps(
-                {
-                    "cmd": cmd,
-                    "kwargs": {k: (str(v) if isinstance(v, Path) else v) for k, v in kwargs.items()},
-                    "result": str(result_file),
-                }
-            )
-            with self._send_msg(cmd, result_file, msg) as status:
-                while not status.done:  # pragma: no branch
-                    sleep(0.001)  # wait a bit for things to happen
-            if result_file.exists():
-                try:
-                    with result_file.open("rt") as result_handler:
-                        result = json.load(result_handler)
-                finally:
-                    result_file.unlink()
-            else:
-                result = {
-                    "code": 1,
-                    "exc_type": "RuntimeError",
-                    "exc_msg": f"Backend response file {result_file} is missing",
-                }
-        out, err = status.out_err()
+        (result,), out, err = self._send_batch([(cmd, kwargs)])
         if "return" in result:
             return result["return"], out, err
         raise BackendFailed(result, out, err)
 
+    def _send_batch(self, cmds: Sequence[Tuple[str, Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], str, str]:
+        messages: List[Tuple[str, Optional[Path], str]] = []
+        result_files: List[Path] = []
+        try:
+            for cmd, kwargs in cmds:
+                result_file: Optional[Path] = None
+                if self.RESULT_VIA_FILE:
+                    result_fd, result_name = mkstemp(prefix=f"pep517_{cmd}-", suffix=".json")
+                    os.close(result_fd)  # the backend writes the content
+                    result_file = Path(result_name)
+                    result_files.append(result_file)  # tracked before encoding, that may fail on bad arguments
+                msg = _ENCODE(
+                    {"cmd": cmd, "kwargs": kwargs, "result": None if result_file is None else str(result_file)},
+                )
+                messages.append((cmd, result_file, msg))
+            with self._send_msgs(messages) as status:
+                status.wait()
+            out, err = status.out_err()
+            results, out = _extract_responses(out)
+            err = err.replace(f"{RESPONSE_MARKER}\n", "")
+            if self.RESULT_VIA_FILE:
+                results = [self._read_result(cast(Path, result_file)) for _, result_file, _ in messages]
+            else:
+                for cmd, _, _ in messages[len(results) :]:  # the backend stopped before responding to these
+                    results.append(_missing_response(f"Backend response to {cmd} is missing"))
+        finally:
+            for result_file in result_files:
+                if result_file.exists():
+                    result_file.unlink()
+        return results, out, err
+
+    @staticmethod
+    def _read_result(result_file: Path) -> Dict[str, Any]:
+        content = result_file.read_text() if result_file.exists() else ""
+        if content:  # the file is created up front, so no content means the backend did not respond
+            return cast(Dict[str, Any], _DECODE(content))
+        return _missing_response(f"Backend response file {result_file} is missing")
+
+    @contextmanager
+    def _send_msgs(self, messages: Sequence[Tuple[str, Optional[Path], str]]) -> Iterator[CmdStatus]:
+        """Send multiple messages, by default one after the other (frontends able to batch should override this)."""
+        if len(messages) == 1:
+            with self._send_msg(*messages[0]) as status:
+                yield status
+            return
+        statuses = []
+        for message in messages:
+            with self._send_msg(*message) as status:
+                status.wait()
+            statuses.append(status)
+        yield _CmdStatusGroup(statuses)
+
     @abstractmethod
     @contextmanager
-    def _send_msg(self, cmd: str, result_file: Path, msg: str) -> Iterator[CmdStatus]:
+    def _send_msg(self, cmd: str, result_file: Optional[Path], msg: str) -> Iterator[CmdStatus]:
         raise NotImplementedError
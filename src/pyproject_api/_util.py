@@ -1,22 +1,37 @@
+import locale
+import os
+from itertools import chain
 from pathlib import Path
 from shutil import rmtree
 
 
 def ensure_empty_dir(path: Path) -> None:
-    if path.exists():
-        if path.is_dir():
-            for sub_path in path.iterdir():
-                if sub_path.is_dir():
-                    rmtree(sub_path, ignore_errors=True)
-                else:
-                    sub_path.unlink()
-        else:
-            path.unlink()
-            path.mkdir()
-    else:
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
         path.mkdir(parents=True)
+    except NotADirectoryError:
+        path.unlink()
+        path.mkdir()
+    else:
+        # the folder itself is kept (it may be a mount point, or not removable), only its content is removed
+        with entries:  # directory entries cache the file type, so no extra stat per child
+            first = next(entries, None)
+            if first is None:  # already empty, the common case for fresh metadata folders
+                return
+            for entry in chain((first,), entries):
+                if entry.is_dir(follow_symlinks=False):
+                    rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.unlink(entry.path)
+
+
+def decode_output(data: bytes) -> str:
+    """:return: process output decoded the same way a universal newlines text mode pipe would"""
+    return data.decode(locale.getpreferredencoding(False), errors="replace").replace("\r\n", "\n").replace("\r", "\n")
 
 
 __all__ = [
     "ensure_empty_dir",
+    "decode_output",
 ]
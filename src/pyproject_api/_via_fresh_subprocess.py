@@ -3,35 +3,40 @@ import sys
 from contextlib import contextmanager
 from pathlib import Path
 from subprocess import PIPE, Popen
-from threading import Thread
-from typing import IO, Any, Iterator, Optional, Tuple, cast
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple, cast
 
 from packaging.requirements import Requirement
 
 from ._frontend import CmdStatus, Frontend
+from ._util import decode_output
 
 
-class SubprocessCmdStatus(CmdStatus, Thread):
-    def __init__(self, process: "Popen[str]") -> None:
-        super().__init__()
+class SubprocessCmdStatus(CmdStatus):
+    def __init__(self, process: "Popen[bytes]") -> None:
         self.process = process
         self._out_err: Optional[Tuple[str, str]] = None
-        self.start()
-
-    def run(self) -> None:
-        self._out_err = self.process.communicate()
 
     @property
     def done(self) -> bool:
-        return self.process.returncode is not None
+        self.wait()  # communicating returns only once the process exited, so afterwards the command is finished
+        return True
+
+    def wait(self) -> None:
+        if self._out_err is None:  # drain the pipes on the calling thread, no need for a helper thread to poll
+            out, err = self.process.communicate()
+            self._out_err = decode_output(out), decode_output(err)
 
     def out_err(self) -> Tuple[str, str]:
+        self.wait()
         return cast(Tuple[str, str], self._out_err)
 
 
 class SubprocessFrontend(Frontend):
     """A frontend that creates fresh subprocess at every call to communicate with the backend."""
 
+    #: keep the backend process alive between messages
+    _REUSE_BACKEND: bool = False
+
     def __init__(
         self,
         root: Path,
@@ -47,25 +52,64 @@ class SubprocessFrontend(Frontend):
         :param backend_obj: object within the backend module identifying the backend
         :param requires: seed requirements for the backend
         """
-        super().__init__(root, backend_paths, backend_module, backend_obj, requires, reuse_backend=False)
+        super().__init__(root, backend_paths, backend_module, backend_obj, requires, reuse_backend=self._REUSE_BACKEND)
+        self._env: Dict[str, str] = {}
+        self.refresh_env()
 
-    @contextmanager
-    def _send_msg(self, cmd: str, result_file: Path, msg: str) -> Iterator[SubprocessCmdStatus]:  # noqa: U100
+    def refresh_env(self) -> None:
+        """Take a new snapshot of the current process environment to use for the backend processes."""
         env = os.environ.copy()
         backend = os.pathsep.join(str(i) for i in self._backend_paths).strip()
         if backend:
             env["PYTHONPATH"] = backend
+        self._env = env
+
+    @contextmanager
+    def _send_msg(self, cmd: str, result_file: Optional[Path], msg: str) -> Iterator[CmdStatus]:
+        with self._run_backend([(cmd, result_file, msg)]) as status:
+            yield status
+
+    @contextmanager
+    def _send_msgs(self, messages: Sequence[Tuple[str, Optional[Path], str]]) -> Iterator[CmdStatus]:
+        with self._run_backend(messages) as status:
+            yield status
+
+    @contextmanager
+    def _run_backend(self, messages: Sequence[Tuple[str, Optional[Path], str]]) -> Iterator[SubprocessCmdStatus]:
+        status = self._start_backend(messages)
+        try:
+            yield status
+        finally:
+            status.wait()  # always reap the backend, even if the caller did not wait for it
+
+    def _start_backend(self, messages: Sequence[Tuple[str, Optional[Path], str]]) -> SubprocessCmdStatus:
         process = Popen(
-            args=[sys.executable] + self.backend_args,
+            args=self._backend_cmd(messages),
             stdout=PIPE,
             stderr=PIPE,
             stdin=PIPE,
-            universal_newlines=True,
-            cwd=self._root,
-            env=env,
+            env=self._env,
+            **self._spawn_kwargs(),
         )
-        cast(IO[str], process.stdin).write(f"{os.linesep}{msg}{os.linesep}")
-        yield SubprocessCmdStatus(process)
+        cast(IO[bytes], process.stdin).write(self._encode_messages(messages))
+        return SubprocessCmdStatus(process)
+
+    @staticmethod
+    def _encode_messages(messages: Sequence[Tuple[str, Optional[Path], str]]) -> bytes:
+        return "".join(f"{os.linesep}{msg}{os.linesep}" for _, _, msg in messages).encode("utf-8")
+
+    def _backend_cmd(self, messages: Sequence[Tuple[str, Optional[Path], str]]) -> List[str]:
+        # with multiple messages the backend must process them all, until its standard input is closed
+        return [sys.executable, *self._make_backend_args(reuse=self._reuse_backend or len(messages) > 1)]
+
+    def _spawn_kwargs(self) -> Dict[str, Any]:
+        # Popen can only use posix_spawn instead of fork and exec when it does not need to change the working directory
+        # or close file descriptors - the latter is safe to skip as file descriptors are not inheritable by default
+        try:
+            in_root = os.getcwd() == str(self._root)
+        except OSError:  # the current working directory has been removed, so changing it is the only way
+            in_root = False
+        return {"cwd": None if in_root else self._root, "close_fds": os.name != "posix"}
 
     def send_cmd(self, cmd: str, **kwargs: Any) -> Tuple[Any, str, str]:
         """
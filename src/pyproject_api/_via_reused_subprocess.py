@@ -0,0 +1,207 @@
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from subprocess import PIPE, Popen
+from threading import Condition, Thread
+from types import TracebackType
+from typing import IO, Callable, Iterator, Optional, Sequence, Tuple, Type, cast
+
+from packaging.requirements import Requirement
+
+from ._backend import RESPONSE_MARKER
+from ._frontend import CmdStatus
+from ._util import decode_output
+from ._via_fresh_subprocess import SubprocessFrontend
+
+_MARKER = RESPONSE_MARKER.encode("utf-8")
+
+
+def _end_of_out(content: bytearray, count: int) -> Optional[int]:
+    """:return: where the standard output of ``count`` commands ends (response frame plus the done line after it)"""
+    at = 0
+    for _ in range(count):
+        start = content.find(_MARKER, at)
+        if start == -1:
+            return None
+        size_start = start + len(_MARKER)
+        size_end = content.find(b"\n", size_start)
+        if size_end == -1:
+            return None
+        at = content.find(b"\n", size_end + 1 + int(content[size_start:size_end])) + 1
+        if at == 0:
+            return None
+    return at
+
+
+def _end_of_err(content: bytearray, count: int) -> Optional[int]:
+    """:return: where the standard error of ``count`` commands ends"""
+    at = 0
+    for _ in range(count):
+        start = content.find(_MARKER + b"\n", at)
+        if start == -1:
+            return None
+        at = start + len(_MARKER) + 1
+    return at
+
+
+class _StreamCollector(Thread):
+    """Collects the content of a stream, so that it can be split up per command."""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        super().__init__(daemon=True)
+        self._stream = stream
+        self._content = bytearray()
+        self._closed = False
+        self._condition = Condition()
+        self.start()
+
+    def run(self) -> None:
+        while True:
+            data = os.read(self._stream.fileno(), 1 << 16)
+            with self._condition:
+                self._content += data
+                self._closed = not data
+                self._condition.notify_all()
+            if not data:
+                break
+
+    @property
+    def closed(self) -> bool:
+        with self._condition:
+            return self._closed
+
+    def has(self, find_end: Callable[[bytearray], Optional[int]]) -> bool:
+        with self._condition:
+            return self._closed or find_end(self._content) is not None
+
+    def take(self, find_end: Callable[[bytearray], Optional[int]]) -> bytes:
+        """Wait until the end can be found (or the stream closed), and take the content until that."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._closed or find_end(self._content) is not None)
+            end = find_end(self._content)
+            if end is None:  # the backend is gone, everything left belongs to this command
+                end = len(self._content)
+            data = bytes(self._content[:end])
+            del self._content[:end]
+        return data
+
+
+class ReusedCmdStatus(CmdStatus):
+    def __init__(self, out: _StreamCollector, err: _StreamCollector, count: int) -> None:
+        self._out = out
+        self._err = err
+        self._count = count
+        self._out_err: Optional[Tuple[str, str]] = None
+
+    def _end_of_out(self, content: bytearray) -> Optional[int]:
+        return _end_of_out(content, self._count)
+
+    def _end_of_err(self, content: bytearray) -> Optional[int]:
+        return _end_of_err(content, self._count)
+
+    @property
+    def done(self) -> bool:
+        return self._out_err is not None or (self._out.has(self._end_of_out) and self._err.has(self._end_of_err))
+
+    def wait(self) -> None:
+        if self._out_err is None:
+            out, err = self._out.take(self._end_of_out), self._err.take(self._end_of_err)
+            self._out_err = decode_output(out), decode_output(err)
+
+    def out_err(self) -> Tuple[str, str]:
+        self.wait()  # the output of this command must be consumed, else it would be attributed to the next one
+        return cast(Tuple[str, str], self._out_err)
+
+
+class ReuseSubprocessFrontend(SubprocessFrontend):
+    """A frontend that creates a subprocess once and sends all messages to it (stop it via :meth:`close`)."""
+
+    _REUSE_BACKEND = True
+
+    def __init__(
+        self,
+        root: Path,
+        backend_paths: Tuple[Path, ...],
+        backend_module: str,
+        backend_obj: Optional[str],
+        requires: Tuple[Requirement, ...],
+    ):
+        """
+        :param root: the root path to the built project
+        :param backend_paths: paths that are available on the python path for the backend
+        :param backend_module: module where the backend is located
+        :param backend_obj: object within the backend module identifying the backend
+        :param requires: seed requirements for the backend
+        """
+        super().__init__(root, backend_paths, backend_module, backend_obj, requires)
+        self._backend: Optional[Tuple["Popen[bytes]", _StreamCollector, _StreamCollector]] = None
+
+    def __enter__(self) -> "ReuseSubprocessFrontend":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],  # noqa: U100
+        exc_val: Optional[BaseException],  # noqa: U100
+        exc_tb: Optional[TracebackType],  # noqa: U100
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the backend subprocess (if running)."""
+        if self._backend is not None:
+            process, out, err = self._backend
+            self._backend = None
+            cast(IO[bytes], process.stdin).close()  # the backend stops once its standard input is closed
+            process.wait()
+            for collector in (out, err):
+                collector.join()
+            for stream in (process.stdout, process.stderr):
+                cast(IO[bytes], stream).close()
+
+    @contextmanager
+    def _send_msg(self, cmd: str, result_file: Optional[Path], msg: str) -> Iterator[CmdStatus]:
+        with self._send_msgs([(cmd, result_file, msg)]) as status:
+            yield status
+
+    @contextmanager
+    def _send_msgs(self, messages: Sequence[Tuple[str, Optional[Path], str]]) -> Iterator[CmdStatus]:
+        process, out, err = self._running_backend()
+        stdin = cast(IO[bytes], process.stdin)
+        try:
+            stdin.write(self._encode_messages(messages))
+            stdin.flush()
+        except OSError:  # pragma: no cover # the backend is gone, the status reports what it left behind
+            pass
+        status = ReusedCmdStatus(out, err, len(messages))
+        try:
+            yield status
+        except BaseException:
+            # the unread output of these commands would be attributed to the next one, so start afresh instead
+            process.kill()
+            self.close()
+            raise
+        status.wait()  # consume the output of these commands, even if the caller did not read it
+        if any(cmd == "_exit" for cmd, _, _ in messages):  # the backend stops after this command
+            self.close()
+
+    def _running_backend(self) -> Tuple["Popen[bytes]", _StreamCollector, _StreamCollector]:
+        if self._backend is not None and (self._backend[0].poll() is not None or self._backend[1].closed):
+            self.close()  # the backend died, start a new one
+        if self._backend is None:
+            process = Popen(
+                args=[sys.executable, *self.backend_args],
+                stdout=PIPE,
+                stderr=PIPE,
+                stdin=PIPE,
+                env=self._env,
+                **self._spawn_kwargs(),
+            )
+            out = _StreamCollector(cast(IO[bytes], process.stdout))
+            err = _StreamCollector(cast(IO[bytes], process.stderr))
+            self._backend = process, out, err
+        return self._backend
+
+
+__all__ = ("ReuseSubprocessFrontend",)
@@ -1,12 +1,16 @@
+import sys
+from contextlib import contextmanager
 from pathlib import Path
 from textwrap import dedent
-from typing import Callable
+from typing import Callable, Iterator, Optional, Sequence, Tuple
 
 import pytest
 from packaging.requirements import Requirement
 
-from pyproject_api._frontend import BackendFailed
+from pyproject_api._backend import RESPONSE_MARKER
+from pyproject_api._frontend import BackendFailed, CmdStatus, Frontend
 from pyproject_api._via_fresh_subprocess import SubprocessFrontend
+from pyproject_api._via_reused_subprocess import ReuseSubprocessFrontend, _end_of_err, _end_of_out
 
 
 @pytest.fixture()
@@ -29,6 +33,7 @@ def test_missing_backend(local_builder: Callable[[str], Path]) -> None:
         fronted.build_wheel(tmp_path / "wheel")
     exc = context.value
     assert exc.exc_type == "RuntimeError"
+    assert exc.exc_msg == "Backend response to build_wheel is missing"
     assert exc.code == 1
     assert "failed to start backend" in exc.err
     assert "ModuleNotFoundError: No module named " in exc.err
@@ -67,6 +72,8 @@ def test_backend_no_prepare_wheel(tmp_path: Path, demo_pkg_inline: Path) -> None
     fronted = SubprocessFrontend(*SubprocessFrontend.create_args_from_folder(demo_pkg_inline)[:-1])
     result = fronted.prepare_metadata_for_build_wheel(tmp_path)
     assert result.metadata.name == "demo_pkg_inline-1.0.0.dist-info"
+    assert [i.name for i in tmp_path.iterdir()] == [result.metadata.name]  # only the metadata is extracted
+    assert {i.name for i in result.metadata.iterdir()} == {"METADATA", "WHEEL", "RECORD", "top_level.txt"}
 
 
 def test_backend_build_sdist_demo_pkg_inline(tmp_path: Path, demo_pkg_inline: Path) -> None:
@@ -109,6 +116,46 @@ def test_get_requires_for_build_missing(of_type: str, local_builder: Callable[[s
     assert result.requires == ()
 
 
+class _SequentialFrontend(SubprocessFrontend):
+    @contextmanager
+    def _send_msgs(self, messages: Sequence[Tuple[str, Optional[Path], str]]) -> Iterator[CmdStatus]:
+        with Frontend._send_msgs(self, messages) as status:
+            yield status
+
+
+@pytest.mark.parametrize("frontend_type", [SubprocessFrontend, _SequentialFrontend])
+def test_get_requires_for_build_both(
+    frontend_type: Callable[..., Frontend], local_builder: Callable[[str], Path]
+) -> None:
+    txt = """
+    def get_requires_for_build_sdist(config_settings=None):
+        print("sdist requires")
+        return ["a"]
+
+    def get_requires_for_build_wheel(config_settings=None):
+        print("wheel requires")
+        return ["b", "c"]
+    """
+    tmp_path = local_builder(txt)
+    fronted = frontend_type(*SubprocessFrontend.create_args_from_folder(tmp_path)[:-1])
+    sdist, wheel = fronted.get_requires_for_build_both()
+    assert [str(i) for i in sdist.requires] == ["a"]
+    assert [str(i) for i in wheel.requires] == ["b", "c"]
+    assert sdist.out == wheel.out
+    assert "\0" not in sdist.out  # the framed responses are not part of the output
+    assert sdist.out.index("sdist requires") < sdist.out.index("wheel requires")
+    assert [str(i) for i in fronted.get_requires_for_build_sdist().requires] == ["a"]
+
+
+def test_get_requires_for_build_both_missing(local_builder: Callable[[str], Path]) -> None:
+    tmp_path = local_builder("def get_requires_for_build_wheel(config_settings=None): return 1")
+    fronted = SubprocessFrontend(*SubprocessFrontend.create_args_from_folder(tmp_path)[:-1])
+    with pytest.raises(BackendFailed) as context:
+        fronted.get_requires_for_build_both()
+    msg = "'get_requires_for_build_wheel' on 'build_tester' returned 1 but expected type 'list of string'"
+    assert context.value.exc_msg == msg
+
+
 @pytest.mark.parametrize("of_type", ["sdist", "wheel"])
 def test_bad_return_type_get_requires_for_build(of_type: str, local_builder: Callable[[str], Path]) -> None:
     tmp_path = local_builder(f"def get_requires_for_build_{of_type}(config_settings=None): return 1")
@@ -199,6 +246,265 @@ def test_bad_wheel_prepare_metadata_for_build_wheel(local_builder: Callable[[str
         fronted.prepare_metadata_for_build_wheel(tmp_path / "meta")
 
 
+def test_failing_prepare_metadata_for_build_wheel_no_wheel_build(local_builder: Callable[[str], Path]) -> None:
+    txt = """
+    def prepare_metadata_for_build_wheel(metadata_directory, config_settings=None):
+        raise ValueError("bad metadata")
+
+    def build_wheel(wheel_directory, config_settings=None, metadata_directory=None):
+        raise AssertionError("must not build a wheel")
+    """
+    tmp_path = local_builder(txt)
+    fronted = SubprocessFrontend(*SubprocessFrontend.create_args_from_folder(tmp_path)[:-1])
+
+    with pytest.raises(BackendFailed) as context:
+        fronted.prepare_metadata_for_build_wheel(tmp_path / "meta")
+    assert context.value.exc_type == "ValueError"
+    assert context.value.exc_msg == "bad metadata"
+
+
+def test_not_implemented_prepare_metadata_for_build_wheel(local_builder: Callable[[str], Path]) -> None:
+    txt = """
+    def prepare_metadata_for_build_wheel(metadata_directory, config_settings=None):
+        raise NotImplementedError
+
+    def build_wheel(wheel_directory, config_settings=None, metadata_directory=None):
+        return "out"
+    """
+    tmp_path = local_builder(txt)
+    fronted = SubprocessFrontend(*SubprocessFrontend.create_args_from_folder(tmp_path)[:-1])
+
+    with pytest.raises(RuntimeError, match="missing wheel file return by backed *"):  # falls back to the wheel
+        fronted.prepare_metadata_for_build_wheel(tmp_path / "meta")
+
+
+def test_reuse_backend(local_builder: Callable[[str], Path]) -> None:
+    txt = """
+    import os
+    import sys
+
+    def get_requires_for_build_sdist(config_settings=None):
+        print("sdist out")
+        print("sdist err", file=sys.stderr)
+        return [str(os.getpid())]
+
+    def get_requires_for_build_wheel(config_settings=None):
+        print("wheel out")
+        print("wheel err", file=sys.stderr)
+        return [str(os.getpid())]
+    """
+    tmp_path = local_builder(txt)
+    with ReuseSubprocessFrontend(*ReuseSubprocessFrontend.create_args_from_folder(tmp_path)[:-1]) as fronted:
+        sdist = fronted.get_requires_for_build_sdist()
+        wheel = fronted.get_requires_for_build_wheel()
+        both = fronted.get_requires_for_build_both()
+    assert "sdist out" in sdist.out
+    assert "wheel" not in sdist.out
+    assert "sdist err" in sdist.err
+    assert "wheel" not in sdist.err
+    assert "sdist" not in wheel.out
+    assert "wheel out" in wheel.out
+    assert "sdist" not in wheel.err
+    assert "wheel err" in wheel.err
+    assert "\0" not in wheel.out + wheel.err
+    pids = {str(i) for i in sdist.requires + wheel.requires + both[0].requires + both[1].requires}
+    assert len(pids) == 1  # all served by the same backend process
+
+
+def test_reuse_backend_restarts_after_exit(local_builder: Callable[[str], Path]) -> None:
+    txt = "import os\ndef get_requires_for_build_sdist(config_settings=None): return [str(os.getpid())]"
+    tmp_path = local_builder(txt)
+    fronted = ReuseSubprocessFrontend(*ReuseSubprocessFrontend.create_args_from_folder(tmp_path)[:-1])
+    try:
+        first = fronted.get_requires_for_build_sdist()
+        assert fronted.send_cmd("_exit")[0] == 0
+        second = fronted.get_requires_for_build_sdist()
+    finally:
+        fronted.close()
+    fronted.close()  # closing again is a no-op
+    assert [str(i) for i in first.requires] != [str(i) for i in second.requires]
+
+
+def test_reuse_backend_missing(local_builder: Callable[[str], Path]) -> None:
+    tmp_path = local_builder("")
+    (tmp_path / "pyproject.toml").write_text('[build-system]\nrequires=[]\nbuild-backend = "build_tester"')
+    with ReuseSubprocessFrontend(*ReuseSubprocessFrontend.create_args_from_folder(tmp_path)[:-1]) as fronted:
+        for _ in range(2):  # the second call starts a new backend as the first one died
+            with pytest.raises(BackendFailed) as context:
+                fronted.build_wheel(tmp_path / "wheel")
+            exc = context.value
+            assert exc.exc_msg == "Backend response to build_wheel is missing"
+            assert "failed to start backend" in exc.err
+
+
+def test_reuse_backend_partial_output() -> None:
+    marker = RESPONSE_MARKER.encode()
+    content = bytearray(b"out" + marker + b"2\n{}")
+    assert _end_of_out(content, 1) is None  # the done line after the response did not arrive yet
+    assert _end_of_out(content + b"done\n", 1) == len(content) + 5
+    assert _end_of_out(content + b"done\n", 2) is None
+    assert _end_of_out(bytearray(b"out" + marker + b"2"), 1) is None
+    assert _end_of_err(bytearray(b"err" + marker + b"\n"), 1) == 3 + len(marker) + 1
+    assert _end_of_err(bytearray(b"err" + marker + b"\n"), 2) is None
+
+
+def test_reuse_backend_status_done(local_builder: Callable[[str], Path]) -> None:
+    tmp_path = local_builder("def get_requires_for_build_sdist(config_settings=None): return []")
+    with ReuseSubprocessFrontend(*ReuseSubprocessFrontend.create_args_from_folder(tmp_path)[:-1]) as fronted:
+        msg = '{"cmd": "get_requires_for_build_sdist", "kwargs": {}, "result": null}'
+        with fronted._send_msg("get_requires_for_build_sdist", None, msg) as status:
+            while not status.done:  # pragma: no branch
+                pass
+        assert status.done
+        out, _ = status.out_err()
+    assert "Backend: Wrote response {'return': []} to standard output" in out
+
+
+def test_reuse_backend_not_serializable_return(local_builder: Callable[[str], Path]) -> None:
+    txt = """
+    import os
+
+    def get_requires_for_build_sdist(config_settings=None):
+        return [object()]
+
+    def get_requires_for_build_wheel(config_settings=None):
+        return [str(os.getpid())]
+    """
+    tmp_path = local_builder(txt)
+    with ReuseSubprocessFrontend(*ReuseSubprocessFrontend.create_args_from_folder(tmp_path)[:-1]) as fronted:
+        with pytest.raises(BackendFailed) as context:
+            fronted.send_cmd("get_requires_for_build_sdist")
+        wheel = fronted.get_requires_for_build_wheel()  # the backend is still usable afterwards
+    exc = context.value
+    assert exc.exc_type == "TypeError"
+    assert exc.exc_msg == "Object of type object is not JSON serializable"
+    assert len(wheel.requires) == 1
+
+
+def test_reuse_backend_result_via_file(local_builder: Callable[[str], Path], monkeypatch: pytest.MonkeyPatch) -> None:
+    txt = """
+    import os
+    def get_requires_for_build_sdist(config_settings=None):
+        return [str(os.getpid())]
+    """
+    tmp_path = local_builder(txt)
+    with ReuseSubprocessFrontend(*ReuseSubprocessFrontend.create_args_from_folder(tmp_path)[:-1]) as fronted:
+        monkeypatch.setattr(fronted, "RESULT_VIA_FILE", True)
+        first = fronted.get_requires_for_build_sdist()
+        second = fronted.get_requires_for_build_sdist()
+    assert [str(i) for i in first.requires] == [str(i) for i in second.requires]
+    assert "\0" not in first.out + first.err
+
+
+def test_reuse_backend_bad_message(local_builder: Callable[[str], Path]) -> None:
+    tmp_path = local_builder("def get_requires_for_build_sdist(config_settings=None): return ['a']")
+    with ReuseSubprocessFrontend(*ReuseSubprocessFrontend.create_args_from_folder(tmp_path)[:-1]) as fronted:
+        with fronted._send_msg("bad_cmd", None, "{{") as status:
+            status.wait()
+        _, err = status.out_err()
+        sdist = fronted.get_requires_for_build_sdist()  # the response of the bad message is not mistaken for this one
+    assert "Backend: incorrect request to backend: bytearray(b'{{')" in err
+    assert [str(i) for i in sdist.requires] == ["a"]
+
+
+def test_reuse_backend_interrupted(local_builder: Callable[[str], Path]) -> None:
+    txt = """
+    def get_requires_for_build_sdist(config_settings=None):
+        return ["sdist-req"]
+
+    def get_requires_for_build_wheel(config_settings=None):
+        return ["wheel-req"]
+    """
+    tmp_path = local_builder(txt)
+    with ReuseSubprocessFrontend(*ReuseSubprocessFrontend.create_args_from_folder(tmp_path)[:-1]) as fronted:
+        msg = '{"cmd": "get_requires_for_build_sdist", "kwargs": {}, "result": null}'
+        with pytest.raises(KeyboardInterrupt):
+            with fronted._send_msg("get_requires_for_build_sdist", None, msg) as status:
+                while not status.done:  # pragma: no branch
+                    pass
+                raise KeyboardInterrupt  # the response is there, but never read
+        wheel = fronted.get_requires_for_build_wheel()
+    assert [str(i) for i in wheel.requires] == ["wheel-req"]
+
+
+def test_refresh_env(local_builder: Callable[[str], Path], monkeypatch: pytest.MonkeyPatch) -> None:
+    txt = "import os\ndef get_requires_for_build_sdist(config_settings=None): return [os.environ['PYPROJECT_API_X']]"
+    tmp_path = local_builder(txt)
+    monkeypatch.setenv("PYPROJECT_API_X", "a")
+    fronted = SubprocessFrontend(*SubprocessFrontend.create_args_from_folder(tmp_path)[:-1])
+    monkeypatch.setenv("PYPROJECT_API_X", "b")
+    assert [str(i) for i in fronted.get_requires_for_build_sdist().requires] == ["a"]  # snapshot at creation
+    fronted.refresh_env()
+    assert [str(i) for i in fronted.get_requires_for_build_sdist().requires] == ["b"]
+
+
+def test_backend_args(tmp_path: Path) -> None:
+    fronted = SubprocessFrontend(tmp_path, (), "build", "api", ())
+    assert fronted.backend_args[1:] == ["False", "build", "api"]
+    fronted.backend_args.append("changed")
+    assert fronted.backend_args[1:] == ["False", "build", "api"]  # the caller gets a copy
+    reuse = ReuseSubprocessFrontend(tmp_path, (), "build", None, ())
+    assert reuse.backend_args[1:] == ["True", "build"]
+    message = ("_exit", None, "{}")
+    assert fronted._backend_cmd([message])[2:] == ["False", "build", "api"]
+    assert fronted._backend_cmd([message, message])[2:] == ["True", "build", "api"]  # batch processed in one go
+
+
+def test_send_not_serializable(tmp_path: Path) -> None:
+    fronted = SubprocessFrontend(tmp_path, (), "build", None, ())
+    with pytest.raises(TypeError, match="Object of type object is not JSON serializable"):
+        fronted.send_cmd("build_wheel", wheel_directory=object())
+
+
+@pytest.mark.parametrize("frontend_type", [SubprocessFrontend, ReuseSubprocessFrontend])
+def test_spawn_within_root(
+    frontend_type: Callable[..., SubprocessFrontend],
+    local_builder: Callable[[str], Path],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    tmp_path = local_builder("import os\ndef where(): return os.getcwd()")
+    fronted = frontend_type(*SubprocessFrontend.create_args_from_folder(tmp_path)[:-1])
+    assert fronted._spawn_kwargs()["cwd"] == tmp_path
+    monkeypatch.chdir(tmp_path)
+    assert fronted._spawn_kwargs()["cwd"] is None  # already in place, no need to change the working directory
+    result, _, _ = fronted.send_cmd("where")
+    if isinstance(fronted, ReuseSubprocessFrontend):
+        fronted.close()
+    assert Path(result) == tmp_path
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the working directory can't be removed on Windows")
+@pytest.mark.parametrize("frontend_type", [SubprocessFrontend, ReuseSubprocessFrontend])
+def test_spawn_from_removed_working_directory(
+    frontend_type: Callable[..., SubprocessFrontend],
+    local_builder: Callable[[str], Path],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    tmp_path = local_builder("import os\ndef where(): return os.getcwd()")
+    fronted = frontend_type(*SubprocessFrontend.create_args_from_folder(tmp_path)[:-1])
+    gone = tmp_path / "gone"
+    gone.mkdir()
+    monkeypatch.chdir(gone)
+    gone.rmdir()
+    result, _, _ = fronted.send_cmd("where")
+    if isinstance(fronted, ReuseSubprocessFrontend):
+        fronted.close()
+    assert Path(result) == tmp_path
+
+
+def test_create_args_from_folder_cached(tmp_path: Path) -> None:
+    toml = tmp_path / "pyproject.toml"
+    toml.write_text('[build-system]\nrequires=["a"]\nbuild-backend = "build_tester"')
+    first = SubprocessFrontend.create_args_from_folder(tmp_path)
+    second = SubprocessFrontend.create_args_from_folder(tmp_path)
+    assert first[4] is second[4]  # parsed only once
+
+    toml.write_text('[build-system]\nrequires=["a", "b"]\nbuild-backend = "build_tester"')
+    third = SubprocessFrontend.create_args_from_folder(tmp_path)
+    assert [str(i) for i in third[4]] == ["a", "b"]
+    assert third[4][0] is first[4][0]  # requirements are parsed once
+
+
 def test_create_no_pyproject(tmp_path: Path) -> None:
     result = SubprocessFrontend.create_args_from_folder(tmp_path)
     assert len(result) == 6
@@ -209,3 +515,21 @@ def test_create_no_pyproject(tmp_path: Path) -> None:
     assert all(isinstance(i, Requirement) for i in result[4])
     assert [str(i) for i in result[4]] == ["setuptools>=40.8.0", "wheel"]
     assert result[5] is True
+
+
+def test_cmd_status_wait_polls_done() -> None:
+    class _Status(CmdStatus):
+        def __init__(self) -> None:
+            self.checks = 0
+
+        @property
+        def done(self) -> bool:
+            self.checks += 1
+            return self.checks > 2
+
+        def out_err(self) -> Tuple[str, str]:
+            return "", ""  # pragma: no cover
+
+    status = _Status()
+    status.wait()
+    assert status.checks == 3
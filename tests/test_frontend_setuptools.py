@@ -1,8 +1,6 @@
+import os
 import sys
-from contextlib import contextmanager
 from pathlib import Path
-from stat import S_IWGRP, S_IWOTH, S_IWUSR
-from typing import Iterator, NamedTuple
 
 import pytest
 from _pytest.tmpdir import TempPathFactory
@@ -139,32 +137,35 @@ def test_bad_message(frontend_setuptools: SubprocessFrontend, tmp_path: Path) ->
     assert "Backend: incorrect request to backend: bytearray(b'{{')" in err
 
 
-class _Result(NamedTuple):
-    name: str
+def test_result_via_file(frontend_setuptools: SubprocessFrontend, mocker: MockerFixture) -> None:
+    mocker.patch.object(frontend_setuptools, "RESULT_VIA_FILE", True)
+    result, out, _ = frontend_setuptools.send_cmd("_exit")
+    assert result == 0
+    assert "Backend: Wrote response {'return': 0} to " in out
+
+
+def test_result_file_removed_on_bad_args(
+    frontend_setuptools: SubprocessFrontend, tmp_path: Path, mocker: MockerFixture
+) -> None:
+    mocker.patch.object(frontend_setuptools, "RESULT_VIA_FILE", True)
+    result_file = tmp_path / "pep517_build_wheel-.json"
+    result_file.write_text("")
+    mocker.patch("pyproject_api._frontend.mkstemp", return_value=(os.open(str(result_file), os.O_RDONLY), result_file))
+    with pytest.raises(TypeError, match="Object of type object is not JSON serializable"):
+        frontend_setuptools.send_cmd("build_wheel", wheel_directory=object())
+    assert not result_file.exists()
 
 
 def test_result_missing(frontend_setuptools: SubprocessFrontend, tmp_path: Path, mocker: MockerFixture) -> None:
-    @contextmanager
-    def named_temporary_file(prefix: str) -> Iterator[_Result]:
-        write = S_IWUSR | S_IWGRP | S_IWOTH
-        base = tmp_path / prefix
-        result = base.with_suffix(".json")
-        result.write_text("")
-        result.chmod(result.stat().st_mode & ~write)  # force json write to fail due to R/O
-        patch = mocker.patch("pyproject_api._frontend.Path.exists", return_value=False)  # make it missing
-        try:
-            yield _Result(str(base))
-        finally:
-            patch.stop()
-            result.chmod(result.stat().st_mode | write)  # cleanup
-            result.unlink()
-
-    mocker.patch("pyproject_api._frontend.NamedTemporaryFile", named_temporary_file)
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    result_file = not_a_dir / "pep517__exit-.json"  # force json write to fail as the parent is not a directory
+    mocker.patch.object(frontend_setuptools, "RESULT_VIA_FILE", True)
+    mocker.patch("pyproject_api._frontend.mkstemp", return_value=(os.open(str(not_a_dir), os.O_RDONLY), result_file))
     with pytest.raises(BackendFailed) as context:
         frontend_setuptools.send_cmd("_exit")
     exc = context.value
-    assert exc.exc_msg == f"Backend response file {tmp_path / 'pep517__exit-.json'} is missing"
+    assert exc.exc_msg == f"Backend response file {result_file} is missing"
     assert exc.exc_type == "RuntimeError"
     assert exc.code == 1
     assert "Traceback" in exc.err
-    assert "PermissionError" in exc.err
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+import pytest
+
 from pyproject_api._util import ensure_empty_dir
 
 
@@ -38,3 +40,44 @@ def test_ensure_empty_dir_on_path_folder(tmp_path: Path) -> None:
     (tmp_path / "d").write_text("")
     ensure_empty_dir(tmp_path)
     assert list(tmp_path.iterdir()) == []
+
+
+def test_ensure_empty_dir_keeps_symlink_target(tmp_path: Path) -> None:
+    target = tmp_path / "target"
+    target.mkdir()
+    (target / "a").write_text("")
+    path = tmp_path / "b"
+    path.mkdir()
+    try:
+        (path / "link").symlink_to(target, target_is_directory=True)
+    except OSError:  # pragma: no cover # creating symlinks may need elevated rights on Windows
+        pytest.skip("cannot create symlink")
+    ensure_empty_dir(path)
+    assert list(path.iterdir()) == []
+    assert [i.name for i in target.iterdir()] == ["a"]
+
+
+def test_ensure_empty_dir_on_symlink_to_folder(tmp_path: Path) -> None:
+    target = tmp_path / "target"
+    target.mkdir()
+    (target / "a").write_text("")
+    path = tmp_path / "link"
+    try:
+        path.symlink_to(target, target_is_directory=True)
+    except OSError:  # pragma: no cover # creating symlinks may need elevated rights on Windows
+        pytest.skip("cannot create symlink")
+    ensure_empty_dir(path)
+    assert path.is_symlink()
+    assert list(target.iterdir()) == []
+
+
+def test_ensure_empty_dir_keeps_folder(tmp_path: Path) -> None:
+    path = tmp_path / "a"
+    path.mkdir()
+    (path / "b").mkdir()
+    (path / "c").write_text("")
+    before = path.stat()
+    ensure_empty_dir(path)
+    assert list(path.iterdir()) == []
+    after = path.stat()
+    assert (after.st_ino, after.st_mode) == (before.st_ino, before.st_mode)  # emptied in place, not recreated